@@ -13,6 +13,7 @@ import re
 import json
 import asyncio
 import hashlib
+import pickle
 import requests
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Any
@@ -42,6 +43,11 @@ DEFAULT_CORPUS_URL = "https://raw.githubusercontent.com/minhaz-engg/ragapplicati
 DEFAULT_MODEL = "gpt-4o-mini"
 DEFAULT_TOPK = 50
 
+# Filesystem cache for the BM25 index (survives Streamlit restarts,
+# unlike session_state which only lives in-process).
+INDEX_DIR = "index"
+os.makedirs(INDEX_DIR, exist_ok=True)
+
 # ----------------------------
 # Data Structures
 # ----------------------------
@@ -82,22 +88,27 @@ def simple_tokenize(text: str) -> List[str]:
 # 2. ROBUST PARSING LOGIC
 # ----------------------------
 
+# Compiled once at import; parse_corpus_text runs these per block.
+# Matches blocks: ## Title ... **DocID:** id ... (content) ... until next ##
+_PRODUCT_RX = re.compile(
+    r"(##\s*(?P<title>.+?)\n"
+    r"\*\*DocID:\*\*\s*`(?P<id>[^`]+)`"
+    r"(?P<content>[\s\S]+?))"
+    r"(?=\n##\s|\Z)",
+    re.MULTILINE
+)
+_CATEGORY_RX = re.compile(r"\*\*Category:\*\*\s*(.+)")
+_SOURCE_RX = re.compile(r"\*\*Source:\*\*\s*(.+)")
+_URL_RX = re.compile(r"\*\*URL:\*\*\s*(.+)")
+_PRICE_RX = re.compile(r"\*\*Price:\*\*\s*([\d,.]+)")
+
 def parse_corpus_text(raw_text: str) -> List[ProductDoc]:
     """
     Parses the corpus using Regex. Robust against missing separators.
     """
     docs = []
-    
-    # Matches blocks: ## Title ... **DocID:** id ... (content) ... until next ##
-    product_pattern = re.compile(
-        r"(##\s*(?P<title>.+?)\n"          
-        r"\*\*DocID:\*\*\s*`(?P<id>[^`]+)`" 
-        r"(?P<content>[\s\S]+?))"           
-        r"(?=\n##\s|\Z)",                   
-        re.MULTILINE
-    )
 
-    for match in product_pattern.finditer(raw_text):
+    for match in _PRODUCT_RX.finditer(raw_text):
         try:
             full_block = match.group(1).strip()
             title = match.group("title").strip()
@@ -105,16 +116,16 @@ def parse_corpus_text(raw_text: str) -> List[ProductDoc]:
             content_body = match.group("content")
 
             # Extract Metadata
-            category_m = re.search(r"\*\*Category:\*\*\s*(.+)", content_body)
+            category_m = _CATEGORY_RX.search(content_body)
             category = category_m.group(1).strip() if category_m else "Unknown"
 
-            source_m = re.search(r"\*\*Source:\*\*\s*(.+)", content_body)
+            source_m = _SOURCE_RX.search(content_body)
             source = source_m.group(1).strip() if source_m else "Unknown"
 
-            url_m = re.search(r"\*\*URL:\*\*\s*(.+)", content_body)
+            url_m = _URL_RX.search(content_body)
             url = url_m.group(1).strip() if url_m else None
 
-            price_m = re.search(r"\*\*Price:\*\*\s*([\d,.]+)", content_body)
+            price_m = _PRICE_RX.search(content_body)
             price_val = 0.0
             if price_m:
                 try:
@@ -267,10 +278,26 @@ def process_scraped_data(raw_items: List[Dict], source: str, category_name: str)
 # ----------------------------
 
 def build_index(products: List[ProductDoc]):
-    """Chunks products and builds BM25 index with SMART TOKENIZATION."""
+    """Chunks products and builds BM25 index with SMART TOKENIZATION.
+
+    The built (bm25, chunks, tokenized) tuple is pickled to disk keyed by a
+    hash of the corpus, so a cold start (Streamlit restart) skips the
+    re-tokenization and BM25 rebuild entirely.
+    """
+    corpus_sig = hashlib.sha1("".join(p.doc_id for p in products).encode("utf-8")).hexdigest()
+    cache_path = os.path.join(INDEX_DIR, f"bm25_{corpus_sig}.pkl")
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                bm25, chunks, _tokenized = pickle.load(f)
+            return bm25, chunks
+        except Exception:
+            pass  # Corrupt/stale cache: rebuild below
+
     chunker = RecursiveChunker.from_recipe("markdown", lang="en")
     chunks = []
-    
+
     for p in products:
         sub_chunks = chunker(p.raw_md)
         for c in sub_chunks:
@@ -283,6 +310,13 @@ def build_index(products: List[ProductDoc]):
     # USE SIMPLE_TOKENIZE HERE
     tokenized_corpus = [simple_tokenize(c.text) for c in chunks]
     bm25 = BM25Okapi(tokenized_corpus)
+
+    try:
+        with open(cache_path, "wb") as f:
+            pickle.dump((bm25, chunks, tokenized_corpus), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        pass  # Cache write is best-effort
+
     return bm25, chunks
 
 def get_rag_stream(query: str, bm25: BM25Okapi, chunks: List[ChunkRec], model: str, top_k: int):
@@ -2,9 +2,11 @@
 import os
 import re
 import json
+import math
 import asyncio
 import hashlib
 import pickle
+from collections import Counter
 import numpy as np
 import requests
 from dataclasses import dataclass, field
@@ -91,22 +93,28 @@ def parse_price(price_str: str) -> float:
         except: continue
     return 0.0
 
+# Compiled once at import; parse_corpus_text runs these per block
+_PRODUCT_RX = re.compile(
+    r"(##\s*(?P<title>.+?)\n"
+    r"\*\*DocID:\*\*\s*`(?P<id>[^`]+)`"
+    r"(?P<content>[\s\S]+?))"
+    r"(?=\n##\s|\Z)", re.MULTILINE
+)
+_SOURCE_RX = re.compile(r"\*\*Source:\*\*\s*(.+)")
+_CATEGORY_RX = re.compile(r"\*\*Category:\*\*\s*(.+)")
+_URL_RX = re.compile(r"\*\*URL:\*\*\s*(.+)")
+_PRICE_RX = re.compile(r"\*\*Price:\*\*\s*(.+)")
+
 def parse_corpus_text(raw_text: str, filter_source: str = "Both") -> List[ProductDoc]:
     """Parses the Markdown dataset with Source Filtering."""
     docs = []
-    pattern = re.compile(
-        r"(##\s*(?P<title>.+?)\n"          
-        r"\*\*DocID:\*\*\s*`(?P<id>[^`]+)`" 
-        r"(?P<content>[\s\S]+?))"           
-        r"(?=\n##\s|\Z)", re.MULTILINE
-    )
 
-    for match in pattern.finditer(raw_text):
+    for match in _PRODUCT_RX.finditer(raw_text):
         try:
             full_block = match.group(1).strip()
             content = match.group("content")
             
-            src_m = re.search(r"\*\*Source:\*\*\s*(.+)", content)
+            src_m = _SOURCE_RX.search(content)
             src = src_m.group(1).strip() if src_m else "Unknown"
 
             # FILTERING LOGIC
@@ -117,13 +125,13 @@ def parse_corpus_text(raw_text: str, filter_source: str = "Both") -> List[Produc
             title = match.group("title").strip()
             doc_id = match.group("id").strip()
             
-            cat_m = re.search(r"\*\*Category:\*\*\s*(.+)", content)
+            cat_m = _CATEGORY_RX.search(content)
             cat = cat_m.group(1).strip() if cat_m else "General"
-            
-            url_m = re.search(r"\*\*URL:\*\*\s*(.+)", content)
+
+            url_m = _URL_RX.search(content)
             url = url_m.group(1).strip() if url_m else "#"
-            
-            price_m = re.search(r"\*\*Price:\*\*\s*(.+)", content)
+
+            price_m = _PRICE_RX.search(content)
             price = parse_price(price_m.group(1)) if price_m else 0.0
 
             docs.append(ProductDoc(doc_id, title, src, cat, price, url, full_block))
@@ -238,6 +246,56 @@ async def crawl_category(url: str, source: str) -> List[ProductDoc]:
 # 5. Hybrid Search Engine
 # ----------------------------
 
+class FastBM25(BM25Okapi):
+    """BM25Okapi with vectorized construction and NumPy scoring.
+
+    Document frequencies come from one Counter pass, and the length
+    normalization term k1*(1-b+b*dl/avgdl) is precomputed once as float32,
+    so get_scores reduces to NumPy arithmetic over per-term posting arrays.
+    Produces the same scores as BM25Okapi.
+    """
+
+    def __init__(self, corpus, k1=1.5, b=0.75, epsilon=0.25):
+        self.k1, self.b, self.epsilon = k1, b, epsilon
+        self.corpus_size = len(corpus)
+        self.doc_len = np.array([len(d) for d in corpus], dtype=np.int32)
+        self.avgdl = float(self.doc_len.mean()) if self.corpus_size else 1.0
+
+        # term -> (doc ids, term frequencies) posting arrays
+        raw: Dict[str, List[Tuple[int, int]]] = {}
+        for i, doc in enumerate(corpus):
+            for term, tf in Counter(doc).items():
+                raw.setdefault(term, []).append((i, tf))
+        self._postings = {
+            t: (np.fromiter((i for i, _ in pl), dtype=np.int32, count=len(pl)),
+                np.fromiter((tf for _, tf in pl), dtype=np.float32, count=len(pl)))
+            for t, pl in raw.items()
+        }
+
+        # Okapi IDF with rank_bm25's epsilon floor for negative values
+        self.idf: Dict[str, float] = {}
+        negative = []
+        for t, (ids, _) in self._postings.items():
+            df = len(ids)
+            v = math.log(self.corpus_size - df + 0.5) - math.log(df + 0.5)
+            self.idf[t] = v
+            if v < 0: negative.append(t)
+        self.average_idf = sum(self.idf.values()) / len(self.idf) if self.idf else 0.0
+        for t in negative:
+            self.idf[t] = self.epsilon * self.average_idf
+
+        self.len_norm = (self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl)).astype(np.float32)
+
+    def get_scores(self, query):
+        scores = np.zeros(self.corpus_size, dtype=np.float32)
+        for term in query:
+            post = self._postings.get(term)
+            if post is None: continue
+            ids, tfs = post
+            scores[ids] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + self.len_norm[ids])
+        return scores
+
+
 class HybridSearchEngine:
     def __init__(self, products: List[ProductDoc]):
         self.products = products
@@ -249,6 +307,7 @@ class HybridSearchEngine:
         # Init
         self.update_categories()
         self.rebuild_bm25()
+        self.rebuild_filter_arrays()
         
         # Fresh embeddings for Live Scrape (small), Cache for Dataset (large)
         if len(products) < 500:
@@ -261,7 +320,15 @@ class HybridSearchEngine:
 
     def rebuild_bm25(self):
         tokens = [simple_tokenize(p.title + " " + p.category) for p in self.products]
-        self.bm25 = BM25Okapi(tokens)
+        self.bm25 = FastBM25(tokens)
+
+    def rebuild_filter_arrays(self):
+        # Precomputed once per corpus: search() price-filters with two
+        # vectorized comparisons instead of a Python loop, and category
+        # matching reuses these lowered strings instead of re-lowering every
+        # product per query
+        self.price_arr = np.array([p.price_value for p in self.products], dtype=np.float64)
+        self.cats_lower = [p.category.lower() for p in self.products]
 
     def load_or_generate_embeddings(self):
         if not self.products: return
@@ -311,20 +378,25 @@ class HybridSearchEngine:
 
     def search(self, query: str, filters: Dict, top_k: int = TOP_K) -> List[SearchResult]:
         # 1. Hard Filtering
-        valid_indices = []
-        for i, p in enumerate(self.products):
-            # Price Filter
-            if filters.get('max_price') and p.price_value > filters['max_price']: continue
-            if filters.get('min_price') and p.price_value < filters['min_price']: continue
-            # Category Filter
-            if filters.get('category'):
-                q_cat = filters['category'].lower()
-                p_cat = p.category.lower()
+        # Price bounds as vectorized comparisons over the precomputed array
+        mask = np.ones(len(self.products), dtype=bool)
+        if filters.get('max_price'):
+            mask &= self.price_arr <= filters['max_price']
+        if filters.get('min_price'):
+            mask &= self.price_arr >= filters['min_price']
+
+        # Category Filter (fuzzy both-ways substring, so it stays a loop --
+        # but only over price-surviving rows, with pre-lowered categories)
+        if filters.get('category'):
+            q_cat = filters['category'].lower()
+            q_is_laptop = "laptop" in q_cat
+            for i in np.flatnonzero(mask):
+                p_cat = self.cats_lower[i]
                 if q_cat not in p_cat and p_cat not in q_cat:
-                    if "laptop" in q_cat and ("macbook" in p_cat or "notebook" in p_cat): pass
-                    else: continue
-            valid_indices.append(i)
+                    if q_is_laptop and ("macbook" in p_cat or "notebook" in p_cat): pass
+                    else: mask[i] = False
 
+        valid_indices = np.flatnonzero(mask).tolist()
         if not valid_indices: return []
 
         # 2. Vector Search
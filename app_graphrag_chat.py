@@ -14,9 +14,9 @@ Fixes:
 
 import os
 import re
-import networkx as nx
+import hashlib
 from dataclasses import dataclass
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Tuple
 from collections import defaultdict, deque
 
 import streamlit as st
@@ -54,6 +54,10 @@ class ProductDoc:
 # 1. Parsing & Data Loading
 # ----------------------------
 
+def _corpus_sig(text: str) -> str:
+    """Content signature used to skip index rebuilds on unchanged corpora."""
+    return hashlib.blake2b(text.encode("utf-8", "ignore"), digest_size=16).hexdigest()
+
 def fetch_data(url: str):
     try:
         resp = requests.get(url)
@@ -63,11 +67,22 @@ def fetch_data(url: str):
         st.error(f"Failed to load dataset: {e}")
         return ""
 
+# Price strings use a tiny alphabet; a translate deletion table strips the
+# known junk without entering the regex engine. The digit regex stays as the
+# fallback for anything unexpected.
+_PRICE_JUNK = str.maketrans('', '', ',.৳ \tTkBDtk')
+_DIGITS_RE = re.compile(r'\d+')
+
 def parse_price(price_str: str) -> float:
     if not price_str:
         return 0.0
+    # Fast path: strip currency junk via translate; digit runs joined this
+    # way match what the regex path produces
+    fast = price_str.translate(_PRICE_JUNK)
+    if fast.isdigit():
+        return float(fast)
     # Extract numbers, removing commas and currency symbols
-    nums = re.findall(r'\d+', price_str.replace(',', ''))
+    nums = _DIGITS_RE.findall(price_str)
     if nums:
         return float("".join(nums))
     return 0.0
@@ -79,59 +94,72 @@ def infer_brand(title: str) -> str:
     parts = title.split()
     return parts[0].lower() if parts else "generic"
 
+# One combined pattern, compiled at import: a single C-level sweep per block
+# collects every field instead of seven separate searches per parse call.
+BLOCK_RE = re.compile(
+    r"\*\*DocID:\*\*\s*`(?P<doc_id>[^`]+)`"
+    r"|\*\*Source:\*\*\s*(?P<source>.+)"
+    r"|\*\*Category:\*\*\s*(?P<category>.+)"
+    r"|\*\*Brand:\*\*\s*(?P<brand>.+)"
+    r"|\*\*URL:\*\*\s*(?P<url>\S+)"
+    r"|\*\*Price:\*\*\s*(?P<price>.+)"
+    r"|^##\s*(?P<title>.+)",
+    re.MULTILINE,
+)
+
+_SEP_RE = re.compile(r'\n---\n')
+
+def iter_blocks(text: str):
+    """
+    Yields '---'-separated blocks one at a time. re.split would materialize
+    every block of a multi-megabyte corpus at once; slicing between
+    separator matches keeps only the block being parsed alive.
+    """
+    last = 0
+    for m in _SEP_RE.finditer(text):
+        yield text[last:m.start()]
+        last = m.end()
+    yield text[last:]
+
 def parse_corpus(text: str) -> List[ProductDoc]:
     """
     Robust parsing that handles missing fields (like Brand in StarTech)
     by inferring them from the Title.
     """
-    # Split by the markdown separator
-    product_blocks = re.split(r'\n---\n', text)
-    
     docs = []
-    
-    # Regex patterns
-    re_docid = re.compile(r"\*\*DocID:\*\*\s*`([^`]+)`")
-    re_source = re.compile(r"\*\*Source:\*\*\s*(.+)")
-    re_cat = re.compile(r"\*\*Category:\*\*\s*(.+)")
-    re_brand = re.compile(r"\*\*Brand:\*\*\s*(.+)")
-    re_url = re.compile(r"\*\*URL:\*\*\s*(\S+)")
-    re_price = re.compile(r"\*\*Price:\*\*\s*(.+)")
-    re_title = re.compile(r"^##\s*(.+)", re.MULTILINE)
-
-    for block in product_blocks:
+
+    for block in iter_blocks(text):
         block = block.strip()
         if not block:
             continue
-            
+
+        # Single finditer sweep; first occurrence of each field wins
+        fields: Dict[str, str] = {}
+        for m in BLOCK_RE.finditer(block):
+            key = m.lastgroup
+            if key and key not in fields:
+                fields[key] = m.group(key).strip()
+
         # Basic Validation
-        doc_id_match = re_docid.search(block)
-        if not doc_id_match:
-            continue 
-            
-        doc_id = doc_id_match.group(1).strip()
-        title_match = re_title.search(block)
-        title = title_match.group(1).strip() if title_match else "Unknown Product"
-        
-        source_match = re_source.search(block)
-        source = source_match.group(1).strip() if source_match else "Unknown"
-        
-        cat_match = re_cat.search(block)
-        category = cat_match.group(1).strip().lower() if cat_match else "general"
-        
+        doc_id = fields.get('doc_id')
+        if not doc_id:
+            continue
+
+        title = fields.get('title', "Unknown Product")
+        source = fields.get('source', "Unknown")
+        category = fields.get('category', "general").lower()
+
         # Smart Brand Extraction
-        brand_match = re_brand.search(block)
-        if brand_match:
-            brand = brand_match.group(1).strip().lower()
+        brand = fields.get('brand')
+        if brand:
+            brand = brand.lower()
         else:
             # Fallback: Infer brand from title (Crucial for StarTech)
             brand = infer_brand(title)
-        
-        url_match = re_url.search(block)
-        url = url_match.group(1).strip() if url_match else ""
-        
-        price_match = re_price.search(block)
-        price_val = parse_price(price_match.group(1)) if price_match else 0.0
-        
+
+        url = fields.get('url', "")
+        price_val = parse_price(fields['price']) if 'price' in fields else 0.0
+
         docs.append(ProductDoc(
             doc_id=doc_id,
             title=title,
@@ -142,7 +170,7 @@ def parse_corpus(text: str) -> List[ProductDoc]:
             url=url,
             raw_text=block
         ))
-        
+
     return docs
 
 # ----------------------------
@@ -152,11 +180,12 @@ def parse_corpus(text: str) -> List[ProductDoc]:
 class GraphRAGIndex:
     """
     Maintains TWO BM25 indices (Daraz & StarTech) to ensure representation.
-    Maintains ONE NetworkX Graph for cross-source connections.
+    Maintains ONE brand/category facet index for cross-source connections.
     """
     def __init__(self, docs: List[ProductDoc]):
         self.doc_map = {d.doc_id: d for d in docs}
-        self.graph = nx.Graph()
+        self.doc_to_facets: Dict[str, Tuple[str, ...]] = {}
+        self.facet_to_docs: Dict[str, List[str]] = {}
         
         # Split datasets for balancing
         self.docs_daraz = [d for d in docs if 'daraz' in d.source.lower()]
@@ -182,21 +211,34 @@ class GraphRAGIndex:
         return BM25Okapi(tokenized)
 
     def _build_knowledge_graph(self, docs: List[ProductDoc]):
-        """Nodes: Products, Brands, Categories."""
+        """Nodes: Products, Brands, Categories.
+
+        The graph is bipartite (products on one side, brand/category facet
+        nodes on the other), so two plain dicts cover everything the search
+        path asks of it: doc -> its facets, and facet -> member docs. That
+        gives O(1) adjacency without a general graph library in the loop.
+        """
+        doc_to_facets = self.doc_to_facets
+        facet_to_docs = self.facet_to_docs
+
         for doc in docs:
-            self.graph.add_node(doc.doc_id, type='product', source=doc.source)
-            
+            facets = []
+
             # Brand Link
             if doc.brand and doc.brand != 'generic':
-                brand_node = f"BRAND:{doc.brand}"
-                self.graph.add_node(brand_node, type='brand')
-                self.graph.add_edge(doc.doc_id, brand_node)
-            
+                facets.append(f"BRAND:{doc.brand}")
+
             # Category Link
             if doc.category:
-                cat_node = f"CAT:{doc.category}"
-                self.graph.add_node(cat_node, type='category')
-                self.graph.add_edge(doc.doc_id, cat_node)
+                facets.append(f"CAT:{doc.category}")
+
+            doc_to_facets[doc.doc_id] = tuple(facets)
+            for facet in facets:
+                bucket = facet_to_docs.get(facet)
+                if bucket is None:
+                    facet_to_docs[facet] = [doc.doc_id]
+                else:
+                    bucket.append(doc.doc_id)
 
     def search(self, query: str, total_k: int = 20) -> List[ProductDoc]:
         """
@@ -222,39 +264,38 @@ class GraphRAGIndex:
                 combined_candidates.append(startech_hits[i])
                 
         # -- Step 3: Graph Expansion --
-        # Find siblings of the top matches
-        graph_hits = set()
+        # Find siblings of the top matches. Siblings are tracked by doc_id:
+        # facet buckets only ever hold product ids, so no per-sibling type
+        # probes are needed, and the set holds cheap strings rather than
+        # dataclass instances.
+        graph_hit_ids: Set[str] = set()
         if combined_candidates:
             # Use top 3 best matches to find neighbors
             seeds = combined_candidates[:3]
             for seed in seeds:
-                try:
-                    neighbors = list(self.graph.neighbors(seed.doc_id))
-                    for node in neighbors:
-                        # If node is Brand or Category, get its other products
-                        siblings = list(self.graph.neighbors(node))
-                        for sib_id in siblings:
-                            if sib_id != seed.doc_id and sib_id in self.doc_map:
-                                graph_hits.add(self.doc_map[sib_id])
-                except:
-                    pass # Node might not exist in graph if generic
-        
+                # Facets may be empty if brand was generic
+                for facet in self.doc_to_facets.get(seed.doc_id, ()):
+                    # Every member of a facet bucket is another product
+                    for sib_id in self.facet_to_docs.get(facet, ()):
+                        if sib_id != seed.doc_id:
+                            graph_hit_ids.add(sib_id)
+
         # Add a few graph hits to the end if not already present
         final_results = []
         seen_ids = set()
-        
+
         # Add ranked keyword results first
         for doc in combined_candidates:
             if doc.doc_id not in seen_ids:
                 final_results.append(doc)
                 seen_ids.add(doc.doc_id)
-        
+
         # Add graph discoveries (limit 5)
-        for doc in list(graph_hits)[:5]:
-            if doc.doc_id not in seen_ids:
-                final_results.append(doc)
-                seen_ids.add(doc.doc_id)
-                
+        for sib_id in list(graph_hit_ids)[:5]:
+            if sib_id not in seen_ids:
+                final_results.append(self.doc_map[sib_id])
+                seen_ids.add(sib_id)
+
         return final_results
 
     def _query_bm25(self, bm25_idx, doc_source, query, k):
@@ -272,6 +313,14 @@ class GraphRAGIndex:
 # 3. Streamlit UI
 # ----------------------------
 
+@st.cache_resource(show_spinner=False)
+def get_llm_client(api_key: str):
+    """One OpenAI client per key, built once and reused every chat turn
+    (keeps its HTTP connection pool warm instead of re-initialising per
+    message)."""
+    return OpenAI(api_key=api_key)
+
+
 def main():
     st.set_page_config(page_title=PAGE_TITLE, layout="wide")
     st.title(f"🕸️ {PAGE_TITLE}")
@@ -285,8 +334,16 @@ def main():
             os.environ["OPENAI_API_KEY"] = api_key
         
         if st.button("🔄 Rebuild Index"):
-            st.cache_resource.clear()
-            st.rerun()
+            # Short-circuit on unchanged data: hashing the corpus is cheap,
+            # re-parsing and re-indexing it is not
+            raw_text = fetch_data(DEFAULT_CORPUS_URL)
+            sig = _corpus_sig(raw_text) if raw_text else None
+            if sig and sig == st.session_state.get("corpus_sig"):
+                st.info("Corpus unchanged — index already up to date.")
+            else:
+                st.session_state.pop("graph_index", None)
+                st.cache_resource.clear()
+                st.rerun()
 
     # -- Initialize Index --
     if "graph_index" not in st.session_state:
@@ -298,6 +355,7 @@ def main():
             docs = parse_corpus(raw_text)
             index = GraphRAGIndex(docs)
             st.session_state["graph_index"] = index
+            st.session_state["corpus_sig"] = _corpus_sig(raw_text)
             
             d_count = len(index.docs_daraz)
             s_count = len(index.docs_startech)
@@ -327,13 +385,15 @@ def main():
             st.warning("No products found matching your query.")
             return
 
-        # Prepare Context
-        context_str = ""
-        for i, doc in enumerate(results, 1):
-            context_str += f"[{i}] ({doc.source}) {doc.title} - {doc.price_val} BDT\nLink: {doc.url}\n\n"
+        # Prepare Context: one join over per-doc fragments instead of
+        # growing a string with += per result
+        context_str = "".join(
+            f"[{i}] ({doc.source}) {doc.title} - {doc.price_val} BDT\nLink: {doc.url}\n\n"
+            for i, doc in enumerate(results, 1)
+        )
 
         # LLM Generation
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+        client = get_llm_client(os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
         
         with st.chat_message("assistant"):
             if not client:
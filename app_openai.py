@@ -25,6 +25,7 @@ import os
 import re
 import io
 import json
+import heapq
 import pickle
 import hashlib
 from dataclasses import dataclass
@@ -201,7 +202,8 @@ def parse_combined_products_from_md(md_text: str) -> List[ProductDoc]:
     text = re.sub(r"^#\s*Combined.*?\n", "", text, flags=re.IGNORECASE)
 
     # Split items on '---' with forgiving whitespace
-    parts = [p.strip() for p in re.split(r"\s+---\s+", text) if p.strip()]
+    # Single pass: strip once per part via the walrus binding
+    parts = [ps for p in re.split(r"\s+---\s+", text) if (ps := p.strip())]
 
     products: List[ProductDoc] = []
     for part in parts:
@@ -289,7 +291,7 @@ def product_to_chunks(product: ProductDoc, chunker: RecursiveChunker) -> List[Ch
     try:
         chonks = chunker(product.raw_md)  # typically 1 short chunk
     except Exception:
-        splits = [s.strip() for s in re.split(r"\n{2,}", product.raw_md) if s.strip()]
+        splits = [ss for s in re.split(r"\n{2,}", product.raw_md) if (ss := s.strip())]
         chonks = [{"text": s} for s in splits]
 
     for c in chonks:
@@ -311,7 +313,14 @@ def product_to_chunks(product: ProductDoc, chunker: RecursiveChunker) -> List[Ch
 # BM25 indexing
 # ----------------------------
 
-def build_or_load_bm25(products: List[ProductDoc], lang: str) -> Tuple[BM25Okapi, List[ChunkRec], List[List[str]]]:
+def build_or_load_bm25(products: List[ProductDoc], lang: str) -> Tuple[BM25Okapi, List[ChunkRec], Dict]:
+    """
+    Build (or load from disk) the BM25 index.
+
+    Tokens are interned to int token-ids at index time: BM25 postings, title
+    token sets and source token sets are all stored as ints, so the per-query
+    hot path hashes/compares small ints instead of Python strings.
+    """
     chunker = build_chunker(lang=lang)
     all_chunks: List[ChunkRec] = []
     for p in products:
@@ -319,7 +328,7 @@ def build_or_load_bm25(products: List[ProductDoc], lang: str) -> Tuple[BM25Okapi
 
     # Signature: content + version + lang
     content_sig = _sha1("\n".join([c.doc_id + "\t" + c.text for c in all_chunks]))
-    sig = _sha1(f"v2combined|lang={lang}|{content_sig}")
+    sig = _sha1(f"v4postings|lang={lang}|{content_sig}")
     bm25_pkl, meta_pkl = _index_paths(sig)
 
     if os.path.exists(bm25_pkl) and os.path.exists(meta_pkl):
@@ -327,17 +336,46 @@ def build_or_load_bm25(products: List[ProductDoc], lang: str) -> Tuple[BM25Okapi
             bm25 = pickle.load(f)
         with open(meta_pkl, "rb") as f:
             meta = pickle.load(f)
-        return bm25, meta["chunks"], meta["tokenized_corpus"]
+        return bm25, meta["chunks"], meta["index_data"]
+
+    vocab: Dict[str, int] = {}
 
-    tokenized_corpus = [_tokenize(c.text) for c in all_chunks]
+    def _intern(tokens: List[str]) -> List[int]:
+        ids = []
+        for t in tokens:
+            tid = vocab.get(t)
+            if tid is None:
+                tid = len(vocab)
+                vocab[t] = tid
+            ids.append(tid)
+        return ids
+
+    tokenized_corpus = [_intern(_tokenize(c.text)) for c in all_chunks]
     bm25 = BM25Okapi(tokenized_corpus)
 
+    # Inverted postings (token id -> chunk indices) so the per-query boost is
+    # one union over the query's postings instead of N set intersections.
+    title_postings: Dict[int, List[int]] = {}
+    source_postings: Dict[int, List[int]] = {}
+    for i, c in enumerate(all_chunks):
+        for tid in set(_intern(_tokenize(c.title))):
+            title_postings.setdefault(tid, []).append(i)
+        for tid in set(_intern(_tokenize(c.source or ""))):
+            source_postings.setdefault(tid, []).append(i)
+
+    index_data = {
+        "tokenized_corpus": tokenized_corpus,
+        "vocab": vocab,
+        "title_postings": title_postings,
+        "source_postings": source_postings,
+    }
+
     with open(bm25_pkl, "wb") as f:
         pickle.dump(bm25, f)
     with open(meta_pkl, "wb") as f:
-        pickle.dump({"tokenized_corpus": tokenized_corpus, "chunks": all_chunks}, f)
+        pickle.dump({"index_data": index_data, "chunks": all_chunks}, f)
 
-    return bm25, all_chunks, tokenized_corpus
+    return bm25, all_chunks, index_data
 
 # ----------------------------
 # Retrieval + filtering
@@ -421,7 +459,7 @@ def _parse_query_constraints(q: str) -> Dict[str, Optional[float]]:
 def bm25_search(
     bm25: BM25Okapi,
     chunks: List[ChunkRec],
-    tokenized_corpus: List[List[str]],
+    index_data: Dict,
     query: str,
     top_k: int,
     allowed_sources: Optional[set] = None,
@@ -433,8 +471,11 @@ def bm25_search(
     diversify: bool = True,
 ) -> List[Tuple[ChunkRec, float]]:
 
-    q_tokens = _tokenize(query)
-    scores = bm25.get_scores(q_tokens)
+    # Map query tokens into the index vocabulary; OOV tokens score 0 in BM25
+    # anyway, so dropping them here is lossless.
+    vocab: Dict[str, int] = index_data["vocab"]
+    q_ids = [vocab[t] for t in _tokenize(query) if t in vocab]
+    scores = bm25.get_scores(q_ids)
 
     pairs: List[Tuple[int, float]] = []
     for i, sc in enumerate(scores):
@@ -442,25 +483,34 @@ def bm25_search(
         if _passes_filters(c, allowed_sources, allowed_categories, category_contains, price_min, price_max, rating_min):
             pairs.append((i, float(sc)))
 
-    # Light boosting for title/source keyword matches
-    q_words = set(q_tokens)
+    # Light boosting for title/source keyword matches. The postings union
+    # touches only chunks that actually share a token with the query, so the
+    # per-chunk boost check is a plain membership test.
+    title_postings = index_data["title_postings"]
+    source_postings = index_data["source_postings"]
+    title_hits: set = set()
+    source_hits: set = set()
+    for tid in set(q_ids):
+        title_hits.update(title_postings.get(tid, ()))
+        source_hits.update(source_postings.get(tid, ()))
 
     def _boost(idx: int, s: float) -> float:
-        c = chunks[idx]
         boost = 0.0
-        title_words = set(_tokenize(c.title))
-        if q_words & title_words:
+        if idx in title_hits:
             boost += 0.10 * s
-        src_w = set(_tokenize(c.source or ""))
-        if q_words & src_w:
+        if idx in source_hits:
             boost += 0.05 * s
         return s + boost
 
     pairs = [(i, _boost(i, s)) for (i, s) in pairs]
-    pairs.sort(key=lambda x: x[1], reverse=True)
 
     if not diversify:
-        return [(chunks[i], s) for i, s in pairs[:top_k]]
+        top = heapq.nlargest(top_k, pairs, key=lambda x: x[1])
+        return [(chunks[i], s) for i, s in top]
+
+    # O(N log k) top slab instead of a full sort; 3x oversampling leaves
+    # headroom for the one-chunk-per-doc dedup below.
+    pairs = heapq.nlargest(top_k * 3, pairs, key=lambda x: x[1])
 
     # Diversify: one per doc first
     seen_docs = set()
@@ -593,7 +643,7 @@ if not products:
 
 # Build BM25
 with st.spinner("Chunking (Chonkie) & building BM25 index…"):
-    bm25, chunk_table, tokenized_corpus = build_or_load_bm25(products, lang=lang)
+    bm25, chunk_table, index_data = build_or_load_bm25(products, lang=lang)
 
 # Facets
 all_sources = sorted({p.source for p in products if p.source})
@@ -650,7 +700,7 @@ if go and query.strip():
 
     with st.spinner("Retrieving with BM25…"):
         results = bm25_search(
-            bm25, chunk_table, tokenized_corpus, query,
+            bm25, chunk_table, index_data, query,
             top_k=top_k,
             allowed_sources=allowed_sources,
             allowed_categories=allowed_categories,
@@ -26,11 +26,13 @@ import os
 import re
 import io
 import json
+import heapq
 import pickle
 import hashlib
 import time
+import zlib
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
 from collections import defaultdict
 
 import streamlit as st
@@ -39,6 +41,13 @@ from rank_bm25 import BM25Okapi
 from chonkie import RecursiveChunker
 from dotenv import load_dotenv
 
+# Optional compiled BM25 backend (sparse CSR scoring); falls back to rank_bm25.
+try:
+    import bm25s
+    HAVE_BM25S = True
+except ImportError:
+    HAVE_BM25S = False
+
 load_dotenv()
 
 # ----------------------------
@@ -58,6 +67,16 @@ DEFAULT_TOPK = 10                       # how many chunks for LLM grounding
 DEFAULT_LANG = "en"                     # Chonkie recipe language
 RAPTOR_MODEL = "gpt-4o-mini"            # Model for L1 summary generation
 
+# Static system prompt, byte-identical across turns so OpenAI's server-side
+# prompt-prefix caching can kick in (lower TTFT + discounted cached tokens).
+# Keep the per-query context in the *user* message, never here.
+SYSTEM_PROMPT = (
+    "You are a precise product assistant. Answer ONLY from the provided context. "
+    "The context contains individual products [L0] and category summaries [L1]. "
+    "If the answer isn't present, say you don't know. Keep answers concise with bullets. "
+    "Cite as [#] with DocID, and include URLs when available."
+)
+
 # ----------------------------
 # Data structures
 # ----------------------------
@@ -169,6 +188,33 @@ def _tokenize(text: str) -> List[str]:
     toks = re.findall(r"[A-Za-z0-9_]+", text.lower())
     return [t for t in toks if t not in STOPWORDS]
 
+def _token_mask(tokens: Iterable[str]) -> int:
+    """
+    256-bit Bloom-style bit-set of a token collection (one bit per token).
+    Uses crc32 (stable across processes, unlike built-in hash) so masks can be
+    pickled alongside the index. An AND of two masks is a branchless,
+    collision-tolerant superset test for token overlap.
+    """
+    mask = 0
+    for t in tokens:
+        mask |= 1 << (zlib.crc32(t.encode("utf-8")) & 255)
+    return mask
+
+class _BM25SBackend:
+    """Adapter exposing rank_bm25's get_scores() surface over a bm25s index.
+
+    bm25s scores with eager sparse-matrix ops instead of per-document Python
+    loops, which is substantially faster on corpora of this size. Only built
+    when the optional bm25s package is installed.
+    """
+
+    def __init__(self, tokenized_corpus: List[List[str]]):
+        self._retriever = bm25s.BM25(method="lucene")
+        self._retriever.index(tokenized_corpus, show_progress=False)
+
+    def get_scores(self, query_tokens: List[str]):
+        return self._retriever.get_scores(query_tokens)
+
 @st.cache_resource
 def _ensure_client() -> OpenAI:
     """ (Modified) Caches the client."""
@@ -191,7 +237,8 @@ def parse_combined_products_from_md(md_text: str) -> List[ProductDoc]:
     text = re.sub(r"^#\s*Combined.*?\n", "", text, flags=re.IGNORECASE)
 
     # Split items on '---' with forgiving whitespace
-    parts = [p.strip() for p in re.split(r"\s+---\s+", text) if p.strip()]
+    # Single pass: strip once per part via the walrus binding
+    parts = [ps for p in re.split(r"\s+---\s+", text) if (ps := p.strip())]
 
     products: List[ProductDoc] = []
     for part in parts:
@@ -277,7 +324,7 @@ def product_to_l0_chunks(product: ProductDoc, chunker: RecursiveChunker) -> List
     try:
         chonks = chunker(product.raw_md)  # typically 1 short chunk
     except Exception:
-        splits = [s.strip() for s in re.split(r"\n{2,}", product.raw_md) if s.strip()]
+        splits = [ss for s in re.split(r"\n{2,}", product.raw_md) if (ss := s.strip())]
         chonks = [{"text": s} for s in splits]
 
     for c in chonks:
@@ -417,26 +464,28 @@ def build_or_load_index(
     lang: str,
     raptor_model: str,
     enable_raptor: bool
-) -> Tuple[BM25Okapi, List[ChunkRec], List[List[str]]]:
+) -> Tuple[BM25Okapi, List[ChunkRec], Dict]:
     """
     (Modified) Builds index over L0 (products) and L1 (summaries).
+    Also precomputes per-chunk title bit-masks for the search-time boost.
     """
     client = _ensure_client()
     chunker = build_chunker(lang=lang)
-    
+
     # 1. Generate L0 Chunks (Products)
     l0_chunks: List[ChunkRec] = []
     for p in products:
         l0_chunks.extend(product_to_l0_chunks(p, chunker))
-        
+
     # 2. Load or Generate L1 Chunks (RAPTOR Summaries)
     l1_chunks = load_or_generate_l1_summaries(products, client, raptor_model, enable_raptor)
-    
+
     all_chunks = l0_chunks + l1_chunks
 
     # Signature: content (L0+L1) + version + lang
     content_sig = _sha1("\n".join([c.doc_id + "\t" + c.text for c in all_chunks]))
-    sig = _sha1(f"v3raptor|lang={lang}|{content_sig}")
+    backend = "bm25s" if HAVE_BM25S else "rank_bm25"
+    sig = _sha1(f"v6raptor|{backend}|lang={lang}|{content_sig}")
     bm25_pkl, meta_pkl = _index_paths(sig)
 
     if os.path.exists(bm25_pkl) and os.path.exists(meta_pkl):
@@ -445,19 +494,26 @@ def build_or_load_index(
                 bm25 = pickle.load(f)
             with open(meta_pkl, "rb") as f:
                 meta = pickle.load(f)
-            return bm25, meta["chunks"], meta["tokenized_corpus"]
+            return bm25, meta["chunks"], meta["index_data"]
 
     # --- Build Index (Cache Miss) ---
     with st.spinner("Tokenizing and building BM25 index..."):
         tokenized_corpus = [_tokenize(c.text) for c in all_chunks]
-        bm25 = BM25Okapi(tokenized_corpus)
+        bm25 = _BM25SBackend(tokenized_corpus) if HAVE_BM25S else BM25Okapi(tokenized_corpus)
+
+        title_tokens = [frozenset(_tokenize(c.title)) for c in all_chunks]
+        index_data = {
+            "tokenized_corpus": tokenized_corpus,
+            "title_masks": [_token_mask(toks) for toks in title_tokens],
+            "title_tokens": title_tokens,
+        }
 
         with open(bm25_pkl, "wb") as f:
             pickle.dump(bm25, f)
         with open(meta_pkl, "wb") as f:
-            pickle.dump({"tokenized_corpus": tokenized_corpus, "chunks": all_chunks}, f)
+            pickle.dump({"index_data": index_data, "chunks": all_chunks}, f)
 
-    return bm25, all_chunks, tokenized_corpus
+    return bm25, all_chunks, index_data
 
 # ----------------------------
 # Retrieval + filtering (Unchanged)
@@ -533,7 +589,7 @@ def _parse_query_constraints(q: str) -> Dict[str, Optional[float]]:
 def bm25_search(
     bm25: BM25Okapi,
     chunks: List[ChunkRec],
-    tokenized_corpus: List[List[str]],
+    index_data: Dict,
     query: str,
     top_k: int,
     allowed_sources: Optional[set] = None,
@@ -544,7 +600,7 @@ def bm25_search(
     rating_min: Optional[float] = None,
     diversify: bool = True,
 ) -> List[Tuple[ChunkRec, float]]:
-    """ (Unchanged) Search logic remains the same. """
+    """ (Modified) Title boost is pre-screened via precomputed bit-masks. """
     q_tokens = _tokenize(query)
     scores = bm25.get_scores(q_tokens)
 
@@ -555,12 +611,16 @@ def bm25_search(
             pairs.append((i, float(sc)))
 
     q_words = set(q_tokens)
+    q_mask = _token_mask(q_tokens)
+    title_masks = index_data["title_masks"]
+    title_tokens = index_data["title_tokens"]
 
     def _boost(idx: int, s: float) -> float:
         c = chunks[idx]
         boost = 0.0
-        title_words = set(_tokenize(c.title))
-        if q_words & title_words:
+        # One AND per chunk rules out most non-matches without tokenizing the
+        # title; the exact set check only runs on mask hits (rare collisions).
+        if title_masks[idx] & q_mask and q_words & title_tokens[idx]:
             # Boost L1 summary title matches significantly
             boost += (0.25 if c.level == 1 else 0.10) * s
         src_w = set(_tokenize(c.source or ""))
@@ -568,11 +628,19 @@ def bm25_search(
             boost += 0.05 * s
         return s + boost
 
+    # Boost only a top-k*4 candidate slab: boosts add at most 30% to a raw
+    # score, so anything outside the slab cannot reach the final top_k anyway,
+    # and per-query boosting work drops from O(N) to O(k).
+    pairs = heapq.nlargest(top_k * 4, pairs, key=lambda x: x[1])
     pairs = [(i, _boost(i, s)) for (i, s) in pairs]
-    pairs.sort(key=lambda x: x[1], reverse=True)
 
     if not diversify:
-        return [(chunks[i], s) for i, s in pairs[:top_k]]
+        top = heapq.nlargest(top_k, pairs, key=lambda x: x[1])
+        return [(chunks[i], s) for i, s in top]
+
+    # O(N log k) top slab instead of a full sort; 3x oversampling leaves
+    # headroom for the one-chunk-per-doc dedup below.
+    pairs = heapq.nlargest(top_k * 3, pairs, key=lambda x: x[1])
 
     # Diversify: one per doc first (L0 chunks)
     # L1 chunks are allowed to repeat, as they are unique summaries
@@ -625,14 +693,8 @@ def _build_messages(query: str, results: List[Tuple[ChunkRec, float]]) -> List[D
         meta_line = " | ".join(fields)
         ctx_blocks.append(f"{head}\n{meta_line}\n---\n{c.text}\n")
 
-    system = (
-        "You are a precise product assistant. Answer ONLY from the provided context. "
-        "The context contains individual products [L0] and category summaries [L1]. "
-        "If the answer isn't present, say you don't know. Keep answers concise with bullets. "
-        "Cite as [#] with DocID, and include URLs when available."
-    )
     user = f"Question:\n{query}\n\nContext:\n" + "\n\n".join(ctx_blocks)
-    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user}]
 
 def stream_answer(model: str, messages: List[Dict[str, str]], temperature: float = 0.2):
     """ (Unchanged) """
@@ -716,7 +778,7 @@ if not products:
     st.stop()
 
 # --- MODIFIED: Build unified index (L0 + L1) ---
-bm25, chunk_table, tokenized_corpus = build_or_load_index(
+bm25, chunk_table, index_data = build_or_load_index(
     products,
     lang=lang,
     raptor_model=RAPTOR_MODEL,
@@ -785,7 +847,7 @@ if go and query.strip():
 
     with st.spinner("Retrieving with BM25 (searching L0 products + L1 summaries)…"):
         results = bm25_search(
-            bm25, chunk_table, tokenized_corpus, query,
+            bm25, chunk_table, index_data, query,
             top_k=top_k,
             allowed_sources=allowed_sources,
             allowed_categories=allowed_categories,
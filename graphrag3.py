@@ -15,30 +15,102 @@ Key Architectural Decisions:
 import os
 import re
 import time
+import codecs
+import pickle
+import hashlib
+import functools
 import asyncio
 import aiohttp
-import networkx as nx
+import numpy as np
 import streamlit as st
+from collections import Counter
 from dataclasses import dataclass, field
 from typing import List, Dict, Set, Optional, Tuple
-from rank_bm25 import BM25Okapi
+from scipy.sparse import csc_matrix
 from openai import OpenAI
 from dotenv import load_dotenv
 
 # Initialize Environment
 load_dotenv()
 
+# Optional JIT kernels: numba removes interpreter dispatch from the BM25
+# accumulation and top-k loops. Everything degrades to the NumPy path when
+# numba is not installed.
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+if HAVE_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _score_accumulate(data, indices, indptr, q_cols, out):
+        """Walk the CSC columns for the query tokens, accumulating into out."""
+        for c in q_cols:
+            for j in range(indptr[c], indptr[c + 1]):
+                out[indices[j]] += data[j]
+        return out
+
+    @njit(cache=True)
+    def _topk(scores, k):
+        """Top-k indices/scores (descending) via a bounded min-heap."""
+        n = scores.shape[0]
+        if k > n:
+            k = n
+        heap_s = np.empty(k, np.float32)
+        heap_i = np.empty(k, np.int64)
+        size = 0
+        for i in range(n):
+            s = scores[i]
+            if size < k:
+                heap_s[size] = s
+                heap_i[size] = i
+                j = size
+                size += 1
+                while j > 0:
+                    p = (j - 1) // 2
+                    if heap_s[j] < heap_s[p]:
+                        heap_s[j], heap_s[p] = heap_s[p], heap_s[j]
+                        heap_i[j], heap_i[p] = heap_i[p], heap_i[j]
+                        j = p
+                    else:
+                        break
+            elif s > heap_s[0]:
+                heap_s[0] = s
+                heap_i[0] = i
+                j = 0
+                while True:
+                    l = 2 * j + 1
+                    r = l + 1
+                    m = j
+                    if l < size and heap_s[l] < heap_s[m]:
+                        m = l
+                    if r < size and heap_s[r] < heap_s[m]:
+                        m = r
+                    if m == j:
+                        break
+                    heap_s[j], heap_s[m] = heap_s[m], heap_s[j]
+                    heap_i[j], heap_i[m] = heap_i[m], heap_i[j]
+                    j = m
+        order = np.argsort(-heap_s[:size])
+        return heap_i[:size][order], heap_s[:size][order]
+
 # ----------------------------
 # 1. System Configuration
 # ----------------------------
 @dataclass
 class Config:
     PAGE_TITLE: str = "🛍️ OmniShop AI: Enterprise Edition"
-    CORPUS_URL: str = "https://raw.githubusercontent.com/minhaz-engg/ragapplications/refs/heads/main/refined_dataset/combined_corpus_fixed.md"
+    # One entry today; extra shard URLs are fetched concurrently when added
+    CORPUS_URLS: Tuple[str, ...] = (
+        "https://raw.githubusercontent.com/minhaz-engg/ragapplications/refs/heads/main/refined_dataset/combined_corpus_fixed.md",
+    )
     MODEL_NAME: str = "gpt-4o-mini"
     TOP_K_RETRIEVAL: int = 15  # Slightly reduced for higher precision
     GRAPH_EXPANSION_LIMIT: int = 5
     CACHE_TTL: int = 3600
+    BM25_CACHE_DIR: str = "bm25_cache"
+    ENGINE_CACHE_DIR: str = "engine_cache"
 
     # Noise filtration for clean graph building
     STOP_WORDS: Set[str] = field(default_factory=lambda: {
@@ -59,6 +131,22 @@ class Config:
 
 CFG = Config()
 
+# Hoisted immutable copy: brand membership tests in the parse hot loop hit a
+# module-level frozenset instead of reaching through the config dataclass
+KNOWN_BRANDS = frozenset(CFG.KNOWN_BRANDS)
+
+# Optional Aho-Corasick automaton: one linear scan over the raw title finds
+# every brand mention without tokenizing. Falls back to the token scan when
+# pyahocorasick is not installed.
+try:
+    import ahocorasick
+    _BRAND_AUTOMATON = ahocorasick.Automaton()
+    for _b in KNOWN_BRANDS:
+        _BRAND_AUTOMATON.add_word(_b, _b)
+    _BRAND_AUTOMATON.make_automaton()
+except ImportError:
+    _BRAND_AUTOMATON = None
+
 # ----------------------------
 # 2. Advanced Data Structures
 # ----------------------------
@@ -74,11 +162,9 @@ class ProductDoc:
     url: str
     raw_text: str
     relevance_score: float = 0.0  # Dynamic scoring field
-
-    @property
-    def clean_token_string(self) -> str:
-        """Optimized string for BM25 indexing (heavily weighted on brand/model)."""
-        return f"{self.title} {self.brand} {self.title} {self.category}"
+    # BM25 tokens, precomputed once at ingestion (2x title weighting + brand
+    # + category); avoids re-building and re-tokenizing an f-string per access
+    tokens: List[str] = field(default_factory=list)
 
 # ----------------------------
 # 3. Intelligent Utilities
@@ -91,6 +177,7 @@ class SmartTokenizer:
     regardless of how the user or database formats it.
     """
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def tokenize(text: str) -> List[str]:
         # 1. Replace hyphens with spaces (Standardization)
         clean_text = text.lower().replace("-", " ")
@@ -111,118 +198,398 @@ def infer_brand_advanced(title: str, raw_brand: str = None) -> str:
         return raw_brand.lower()
     
     if not title: return "generic"
-    
-    title_lower = title.lower()
-    tokens = SmartTokenizer.tokenize(title_lower)
-    
-    # 2. Knowledge Base Scan (O(1) lookup per token)
-    for token in tokens:
-        if token in CFG.KNOWN_BRANDS:
-            return token
-            
+
+    # 2. Knowledge Base Scan (automaton: one pass over the raw title;
+    #    otherwise a short-circuiting token scan)
+    if _BRAND_AUTOMATON is not None:
+        tl = title.lower()
+        for end, brand in _BRAND_AUTOMATON.iter(tl):
+            start = end - len(brand) + 1
+            # Word-boundary check so e.g. 'acer' never matches inside 'racer'
+            before = tl[start - 1] if start else " "
+            after = tl[end + 1] if end + 1 < len(tl) else " "
+            if not before.isalnum() and not after.isalnum():
+                return brand
+        tokens = SmartTokenizer.tokenize(title)
+    else:
+        # SmartTokenizer lowercases already; no separate .lower() pass needed
+        tokens = SmartTokenizer.tokenize(title)
+        hit = next((t for t in tokens if t in KNOWN_BRANDS), None)
+        if hit:
+            return hit
+
     # 3. Heuristic Fallback (First valid non-stopword)
     if tokens:
         candidate = tokens[0]
         if candidate not in CFG.STOP_WORDS and len(candidate) > 2 and not candidate.isdigit():
             return candidate
-            
+
     return "generic"
 
 # ----------------------------
 # 4. Asynchronous Ingestion Engine
 # ----------------------------
 
-async def fetch_data_async(url: str) -> str:
-    """Non-blocking fetch using aiohttp."""
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=10) as response:
-                response.raise_for_status()
-                return await response.text()
-        except Exception as e:
-            # Log this in a real app
-            return ""
+# One ClientSession shared across all fetches: connection pooling + TLS reuse
+# instead of paying handshake/pool setup per call (the aiohttp docs explicitly
+# warn against per-request sessions).
+_SESSION: Optional[aiohttp.ClientSession] = None
+_SESSION_LOCK = asyncio.Lock()
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Lazily creates the shared session (lock guards concurrent first calls)."""
+    global _SESSION
+    async with _SESSION_LOCK:
+        if _SESSION is None or _SESSION.closed:
+            _SESSION = aiohttp.ClientSession()
+        return _SESSION
+
+async def _close_session() -> None:
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+async def stream_blocks(url: str):
+    """
+    Streams the corpus and yields fully-formed '---'-delimited blocks as they
+    come off the wire. Peak memory stays at ~one block instead of two full
+    copies of the corpus text, and parsing overlaps with network I/O.
+    """
+    session = await _get_session()
+    buf = ""
+    # Incremental decoder: a multibyte char (e.g. the '৳' on every price
+    # line) split across a chunk boundary is carried over, not destroyed
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    timeout = aiohttp.ClientTimeout(total=10, connect=3)
+    # Fetch and mid-download errors propagate: a truncated corpus must
+    # fail visibly, never get parsed and persisted by the pickle cache
+    async with session.get(url, timeout=timeout) as response:
+        response.raise_for_status()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            buf += decoder.decode(chunk)
+            while True:
+                sep = buf.find("\n---\n")
+                if sep < 0:
+                    break
+                yield buf[:sep]
+                buf = buf[sep + 5:]
+    buf += decoder.decode(b"", final=True)
+    if buf.strip():
+        yield buf
+
+async def ingest_docs(urls: Tuple[str, ...]) -> List[ProductDoc]:
+    """Streams every shard concurrently, parsing blocks as they complete."""
+    async def _one(url: str) -> List[ProductDoc]:
+        docs: List[ProductDoc] = []
+        async for block in stream_blocks(url):
+            doc = parse_block(block)
+            if doc:
+                docs.append(doc)
+        return docs
+
+    shards = await asyncio.gather(*[_one(u) for u in urls])
+    return [d for shard in shards for d in shard]
+
+# One combined pattern: a single C-level scan per block collects every field,
+# instead of running (and re-running) seven separate searches.
+BLOCK_RE = re.compile(
+    r"\*\*DocID:\*\*\s*`(?P<doc_id>[^`]+)`"
+    r"|\*\*Source:\*\*\s*(?P<source>.+)"
+    r"|\*\*Category:\*\*\s*(?P<category>.+)"
+    r"|\*\*Brand:\*\*\s*(?P<brand>.+)"
+    r"|\*\*URL:\*\*\s*(?P<url>\S+)"
+    r"|\*\*Price:\*\*\s*(?P<price>.+)"
+    r"|^##\s*(?P<title>.+)",
+    re.MULTILINE,
+)
+
+def parse_block(block: str) -> Optional[ProductDoc]:
+    """Robust Regex Parsing of a single '---'-delimited block."""
+    if "**DocID:**" not in block: return None
+
+    # Single finditer pass; first occurrence of each field wins
+    fields: Dict[str, str] = {}
+    for m in BLOCK_RE.finditer(block):
+        key = m.lastgroup
+        if key and key not in fields:
+            fields[key] = m.group(key).strip()
+
+    get_val = lambda k: fields.get(k, "")
+
+    title = get_val('title') or "Unknown Product"
+    raw_brand = get_val('brand')
+    final_brand = infer_brand_advanced(title, raw_brand)
+
+    category = get_val('category').lower() or "general"
+
+    # Price Parsing logic
+    price_str = get_val('price')
+    price_val = 0.0
+    if price_str:
+        clean_price = re.sub(r'[^\d.]', '', price_str.replace(',', ''))
+        try: price_val = float(clean_price)
+        except: pass
+
+    return ProductDoc(
+        # blake2b is stable across processes (built-in hash is salted per run,
+        # which would break content-keyed disk caches) and near-memcpy fast
+        doc_id=get_val('doc_id') or f"unk-{hashlib.blake2b(block.encode('utf-8', 'ignore'), digest_size=8).hexdigest()}",
+        title=title,
+        source=get_val('source') or "Unknown",
+        category=category,
+        brand=final_brand,
+        price_val=price_val,
+        url=get_val('url'),
+        raw_text=block,
+        tokens=SmartTokenizer.tokenize(title) * 2
+               + SmartTokenizer.tokenize(final_brand)
+               + SmartTokenizer.tokenize(category),
+    )
 
 def parse_corpus(text: str) -> List[ProductDoc]:
-    """Robust Regex Parsing."""
+    """Parses an already-materialized corpus string (non-streaming path)."""
     if not text: return []
-    
-    product_blocks = re.split(r'\n---\n', text)
-    docs = []
-    
-    # Pre-compiled patterns for performance
-    patterns = {
-        'doc_id': re.compile(r"\*\*DocID:\*\*\s*`([^`]+)`"),
-        'source': re.compile(r"\*\*Source:\*\*\s*(.+)"),
-        'category': re.compile(r"\*\*Category:\*\*\s*(.+)"),
-        'brand': re.compile(r"\*\*Brand:\*\*\s*(.+)"),
-        'url': re.compile(r"\*\*URL:\*\*\s*(\S+)"),
-        'price': re.compile(r"\*\*Price:\*\*\s*(.+)"),
-        'title': re.compile(r"^##\s*(.+)", re.MULTILINE)
-    }
-
-    for block in product_blocks:
-        if "**DocID:**" not in block: continue
-        
-        # Extraction with safe defaults
-        get_val = lambda k: patterns[k].search(block).group(1).strip() if patterns[k].search(block) else ""
-        
-        title = get_val('title') or "Unknown Product"
-        raw_brand = get_val('brand')
-        final_brand = infer_brand_advanced(title, raw_brand)
-        
-        # Price Parsing logic
-        price_str = get_val('price')
-        price_val = 0.0
-        if price_str:
-            clean_price = re.sub(r'[^\d.]', '', price_str.replace(',', ''))
-            try: price_val = float(clean_price)
-            except: pass
-
-        docs.append(ProductDoc(
-            doc_id=get_val('doc_id') or f"unk-{hash(block)}",
-            title=title,
-            source=get_val('source') or "Unknown",
-            category=get_val('category').lower() or "general",
-            brand=final_brand,
-            price_val=price_val,
-            url=get_val('url'),
-            raw_text=block
-        ))
-    return docs
+    blocks = re.split(r'\n---\n', text)
+    return [doc for doc in map(parse_block, blocks) if doc]
 
 # ----------------------------
 # 5. The Hybrid Retrieval Engine (Graph + BM25)
 # ----------------------------
 
+class EagerBM25:
+    """
+    Eager BM25 Index (BM25S-style).
+    Every (doc, term) contribution idf * tf*(k1+1)/(tf + k1*(1-b+b*|D|/avgdl))
+    is computed ONCE at build time and stored in a docs x vocab sparse CSC
+    matrix. Scoring a query is then a column slice + row sum executed in C,
+    instead of rank_bm25's per-term Python posting loop.
+    """
+
+    def __init__(self, tokenized_corpus: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        n_docs = len(tokenized_corpus)
+        doc_lens = np.fromiter((len(t) for t in tokenized_corpus), np.float32, count=n_docs)
+        avgdl = float(doc_lens.mean()) if n_docs else 1.0
+
+        self.token2col: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        tfs: List[int] = []
+        for row_idx, tokens in enumerate(tokenized_corpus):
+            for token, tf in Counter(tokens).items():
+                col = self.token2col.setdefault(token, len(self.token2col))
+                rows.append(row_idx)
+                cols.append(col)
+                tfs.append(tf)
+
+        n_vocab = len(self.token2col)
+        row_arr = np.asarray(rows, np.int32)
+        col_arr = np.asarray(cols, np.int32)
+        tf_arr = np.asarray(tfs, np.float32)
+
+        # Document frequency per column -> non-negative (Lucene-style) IDF
+        df = np.bincount(col_arr, minlength=n_vocab).astype(np.float32)
+        idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+
+        len_norm = k1 * (1.0 - b + b * doc_lens / avgdl)
+        data = idf[col_arr] * tf_arr * (k1 + 1.0) / (tf_arr + len_norm[row_arr])
+        self.matrix = csc_matrix((data, (row_arr, col_arr)), shape=(n_docs, n_vocab))
+        self.matrix.data = self.matrix.data.astype(np.float32, copy=False)
+        self.n_docs = n_docs
+        # Cached index stats: reused by incremental reindexes and persisted
+        # to disk so warm restarts skip the whole build
+        self.idf = idf
+        self.doc_lens = doc_lens
+        self.avgdl = avgdl
+        # MaxScore bound: best possible contribution of each term to any doc
+        self.ms = np.asarray(self.matrix.max(axis=0).todense()).ravel().astype(np.float32)
+
+    def save(self, path: str) -> None:
+        """Persists the full index (matrix + stats + vocab) as compressed npz."""
+        np.savez_compressed(
+            path,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.asarray(self.matrix.shape, np.int64),
+            ms=self.ms,
+            idf=self.idf,
+            doc_lens=self.doc_lens,
+            avgdl=np.float32(self.avgdl),
+            tokens=np.array(list(self.token2col.keys())),
+            cols=np.fromiter(self.token2col.values(), np.int64, count=len(self.token2col)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "EagerBM25":
+        """Restores a saved index without re-tokenizing the corpus."""
+        z = np.load(path, allow_pickle=False)
+        obj = cls.__new__(cls)
+        obj.matrix = csc_matrix((z["data"], z["indices"], z["indptr"]), shape=tuple(z["shape"]))
+        obj.ms = z["ms"]
+        obj.idf = z["idf"]
+        obj.doc_lens = z["doc_lens"]
+        obj.avgdl = float(z["avgdl"])
+        obj.token2col = dict(zip(z["tokens"].tolist(), z["cols"].tolist()))
+        obj.n_docs = int(obj.matrix.shape[0])
+        return obj
+
+    def get_scores(self, tokenized_query: List[str]) -> np.ndarray:
+        # OOV tokens contribute nothing, so dropping them is lossless
+        q_cols = [self.token2col[t] for t in tokenized_query if t in self.token2col]
+        if not q_cols:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        if HAVE_NUMBA:
+            out = np.zeros(self.n_docs, dtype=np.float32)
+            return _score_accumulate(
+                self.matrix.data,
+                self.matrix.indices,
+                self.matrix.indptr,
+                np.asarray(q_cols, np.int64),
+                out,
+            )
+        return np.asarray(self.matrix[:, q_cols].sum(axis=1)).ravel()
+
+    def retrieve(self, tokenized_query: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        MaxScore-pruned top-k retrieval.
+        Terms are processed in decreasing order of their max possible
+        contribution (ms); once the current k-th best score provably cannot be
+        overtaken by any document outside the top-k — even if it received
+        every remaining term's maximum — the rest of the postings are skipped.
+        The returned top-k *set* is exact; ordering within it can differ
+        marginally when low-impact terms are pruned. On multi-term queries
+        this skips a large share of posting traversals.
+        """
+        q_cols = [self.token2col[t] for t in tokenized_query if t in self.token2col]
+        if not q_cols or k <= 0:
+            return np.array([], np.int64), np.array([], np.float32)
+
+        # Query-term multiplicity is preserved (matching get_scores): a
+        # repeated term contributes once per occurrence, so each unique
+        # column's postings pass and ms bound are weighted by its count
+        col_counts = Counter(q_cols)
+        ordered = sorted(col_counts, key=lambda c: -self.ms[c] * col_counts[c])
+        remaining = float(sum(self.ms[c] * col_counts[c] for c in ordered))
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        indptr, indices, data = self.matrix.indptr, self.matrix.indices, self.matrix.data
+
+        for c in ordered:
+            w = col_counts[c]
+            start, end = indptr[c], indptr[c + 1]
+            if w == 1:
+                scores[indices[start:end]] += data[start:end]
+            else:
+                scores[indices[start:end]] += data[start:end] * np.float32(w)
+            remaining -= float(self.ms[c]) * w
+            if remaining <= 0.0:
+                break
+            if self.n_docs > k:
+                # part[n-k] = k-th best, part[n-k-1] = best outside the top-k
+                part = np.partition(scores, (self.n_docs - k - 1, self.n_docs - k))
+                if part[self.n_docs - k] >= part[self.n_docs - k - 1] + remaining:
+                    break
+
+        kk = min(k, self.n_docs)
+        if HAVE_NUMBA:
+            return _topk(scores, kk)
+        top = np.argpartition(-scores, kk - 1)[:kk]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+
 class HybridSearchEngine:
     def __init__(self, docs: List[ProductDoc]):
         self.docs = docs
         self.doc_map = {d.doc_id: d for d in docs}
-        self.graph = nx.Graph()
-        
+        self.doc_idx = {d.doc_id: i for i, d in enumerate(docs)}
+
         # Build Index
         self.bm25 = self._build_bm25()
         self._build_knowledge_graph()
 
     def _build_bm25(self):
-        tokenized_corpus = [SmartTokenizer.tokenize(d.clean_token_string) for d in self.docs]
-        return BM25Okapi(tokenized_corpus)
+        # Warm restarts load the persisted index (keyed by corpus content)
+        # and skip tokenization + matrix assembly entirely
+        os.makedirs(CFG.BM25_CACHE_DIR, exist_ok=True)
+        sig = hashlib.sha1("".join(d.doc_id for d in self.docs).encode("utf-8")).hexdigest()
+        cache_path = os.path.join(CFG.BM25_CACHE_DIR, f"bm25_{sig}.npz")
+
+        if os.path.exists(cache_path):
+            try:
+                bm25 = EagerBM25.load(cache_path)
+                self.tokenized_corpus = None  # not needed on the warm path
+                self._cache_bm25_stats(bm25)
+                return bm25
+            except Exception:
+                pass  # corrupt/stale cache -> rebuild below
+
+        # Materialized on the engine: docs carry their precomputed tokens, so
+        # nothing is re-tokenized here
+        self.tokenized_corpus = [d.tokens for d in self.docs]
+        bm25 = EagerBM25(self.tokenized_corpus)
+        try:
+            bm25.save(cache_path)
+        except Exception:
+            pass  # cache write is best-effort
+        self._cache_bm25_stats(bm25)
+        return bm25
+
+    def _cache_bm25_stats(self, bm25: EagerBM25) -> None:
+        """Keeps IDF/avgdl/doc-length/vocab handy for incremental reindexes."""
+        self._idf = bm25.idf
+        self._avgdl = bm25.avgdl
+        self._doc_lens = bm25.doc_lens
+        self._vocab = bm25.token2col
 
     def _build_knowledge_graph(self):
-        """Constructs a semantic graph linking Products, Brands, and Categories."""
-        for doc in self.docs:
-            self.graph.add_node(doc.doc_id, type='product')
-            
+        """
+        Constructs the Product/Brand/Category graph as CSR adjacency arrays.
+        Products reuse their corpus index as node id; facet nodes (BRAND:*,
+        CAT:*) get ids above n_docs. neighbors() is then a contiguous array
+        slice with no per-hop Python object dereferences.
+        """
+        n_docs = len(self.docs)
+        self.n_docs = n_docs
+        self.facet_ids: Dict[str, int] = {}    # "BRAND:asus" -> node id
+        self.facet_labels: List[str] = []      # node id - n_docs -> label
+
+        def _facet_id(label: str) -> int:
+            nid = self.facet_ids.get(label)
+            if nid is None:
+                nid = n_docs + len(self.facet_labels)
+                self.facet_ids[label] = nid
+                self.facet_labels.append(label)
+            return nid
+
+        src: List[int] = []
+        dst: List[int] = []
+        wts: List[float] = []
+
+        def _add_edge(a: int, b: int, w: float):
+            src.append(a); dst.append(b); wts.append(w)
+            src.append(b); dst.append(a); wts.append(w)
+
+        for i, doc in enumerate(self.docs):
             # Strong Link: Brand
             if doc.brand and doc.brand != "generic":
-                brand_node = f"BRAND:{doc.brand}"
-                self.graph.add_edge(doc.doc_id, brand_node, weight=1.0)
-            
+                _add_edge(i, _facet_id(f"BRAND:{doc.brand}"), 1.0)
             # Weak Link: Category (prevents massive clusters)
             if doc.category and doc.category != "general":
-                cat_node = f"CAT:{doc.category}"
-                self.graph.add_edge(doc.doc_id, cat_node, weight=0.5)
+                _add_edge(i, _facet_id(f"CAT:{doc.category}"), 0.5)
+
+        n_nodes = n_docs + len(self.facet_labels)
+        src_arr = np.asarray(src, np.int64)
+        # Group by source node, heaviest edges first within each group, so a
+        # capped expansion reads the strongest neighbors off the slice head
+        order = np.lexsort((-np.asarray(wts, np.float32), src_arr))
+        self.adj_indices = np.asarray(dst, np.int32)[order]
+        self.adj_weights = np.asarray(wts, np.float32)[order]
+        counts = np.bincount(src_arr, minlength=n_nodes)
+        self.adj_indptr = np.concatenate(([0], np.cumsum(counts)))
+
+    def neighbors(self, nid: int) -> np.ndarray:
+        return self.adj_indices[self.adj_indptr[nid]:self.adj_indptr[nid + 1]]
 
     def search(self, query: str) -> List[ProductDoc]:
         """
@@ -234,59 +601,53 @@ class HybridSearchEngine:
         tokenized_query = SmartTokenizer.tokenize(query)
         if not tokenized_query: return []
 
-        # Step 1: BM25 Retrieval
+        # Step 1: BM25 Retrieval (MaxScore-pruned)
         # We fetch 2x the needed amount to allow for re-ranking
-        raw_scores = self.bm25.get_scores(tokenized_query)
-        top_n_indices = sorted(range(len(raw_scores)), key=lambda i: raw_scores[i], reverse=True)[:CFG.TOP_K_RETRIEVAL * 2]
-        
-        candidates: Dict[str, float] = {}
-        
-        # Normalize BM25 scores (0-1 range roughly)
-        max_score = raw_scores[top_n_indices[0]] if top_n_indices else 1.0
-        
-        for idx in top_n_indices:
-            score = raw_scores[idx]
-            if score <= 0: continue
-            doc = self.docs[idx]
-            # Base Score = Normalized BM25
-            candidates[doc.doc_id] = (score / max_score) * 1.0
+        top_n_indices, top_scores = self.bm25.retrieve(tokenized_query, CFG.TOP_K_RETRIEVAL * 2)
+
+        # Normalize BM25 scores (0-1 range roughly) into a dense score vector
+        # indexed by corpus position
+        score_vec = np.zeros(len(self.docs), dtype=np.float32)
+        max_score = top_scores[0] if len(top_scores) else 1.0
+        positive = top_scores > 0
+        hits = top_n_indices[positive]
+        score_vec[hits] = top_scores[positive] / max_score
 
         # Step 2: Graph Expansion (The "Smart" Boost)
-        # Look at the top 3 strongest matches and find their conceptual siblings
-        top_seeds = sorted(candidates.keys(), key=lambda k: candidates[k], reverse=True)[:3]
-        
-        for seed_id in top_seeds:
-            try:
-                # Get neighbors (Brands/Categories)
-                neighbors = list(self.graph.neighbors(seed_id))
-                for node in neighbors:
-                    # Get siblings (Other products)
-                    siblings = list(self.graph.neighbors(node))
-                    for sib_id in siblings:
-                        if sib_id == seed_id: continue
-                        
-                        # Apply Graph Boost
-                        # If connected via BRAND, high boost. If CATEGORY, low boost.
-                        boost = 0.3 if "BRAND:" in node else 0.1
-                        
-                        if sib_id in candidates:
-                            candidates[sib_id] += boost
-                        elif sib_id in self.doc_map:
-                            # New discovery via graph
-                            candidates[sib_id] = boost
-            except:
-                pass
-
-        # Step 3: Final Selection
-        # Sort by final fused score
-        final_ids = sorted(candidates.keys(), key=lambda k: candidates[k], reverse=True)[:CFG.TOP_K_RETRIEVAL]
-        
+        # Look at the top 3 strongest matches and find their conceptual
+        # siblings; retrieve() returns hits score-descending already
+        for seed_idx in hits[:3]:
+            seed_idx = int(seed_idx)
+            for node in self.neighbors(seed_idx):
+                # If connected via BRAND, high boost. If CATEGORY, low boost.
+                label = self.facet_labels[int(node) - self.n_docs]
+                is_brand = label.startswith("BRAND:")
+                boost = 0.3 if is_brand else 0.1
+
+                # One scattered add applies the boost to every sibling; the
+                # seed itself sits in the sibling slice, so undo its share.
+                # Category clusters can be huge and every member gets the
+                # same flat boost, so expand only the top-weighted few;
+                # brand clusters are small enough to keep whole.
+                siblings = self.neighbors(int(node))
+                if not is_brand:
+                    siblings = siblings[:CFG.GRAPH_EXPANSION_LIMIT]
+                np.add.at(score_vec, siblings, boost)
+                if seed_idx in siblings:
+                    score_vec[seed_idx] -= boost
+
+        # Step 3: Final Selection (partial-select, order the kept slice)
+        k = min(CFG.TOP_K_RETRIEVAL, len(score_vec))
+        top_cand = np.argpartition(-score_vec, k - 1)[:k] if k else np.array([], dtype=np.int64)
+        top_cand = top_cand[np.argsort(-score_vec[top_cand])]
+
         results = []
-        for doc_id in final_ids:
-            doc = self.doc_map[doc_id]
-            doc.relevance_score = candidates[doc_id]
+        for idx in top_cand:
+            if score_vec[idx] <= 0: continue
+            doc = self.docs[int(idx)]
+            doc.relevance_score = float(score_vec[idx])
             results.append(doc)
-            
+
         return results
 
 # ----------------------------
@@ -303,13 +664,33 @@ def get_engine() -> Optional[HybridSearchEngine]:
         # Create a new event loop for the async fetch
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        raw_text = loop.run_until_complete(fetch_data_async(CFG.CORPUS_URL))
+        docs = loop.run_until_complete(ingest_docs(CFG.CORPUS_URLS))
+        loop.run_until_complete(_close_session())
         loop.close()
-        
-        if not raw_text: return None
-        
-        docs = parse_corpus(raw_text)
-        return HybridSearchEngine(docs)
+
+        if not docs: return None
+
+        # st.cache_resource only survives within a process; a pickled engine
+        # (BM25 matrix + graph CSR + docs) keyed by corpus content makes cold
+        # process starts load in milliseconds instead of rebuilding
+        sig = hashlib.blake2b("".join(d.doc_id for d in docs).encode("utf-8"), digest_size=16).hexdigest()
+        os.makedirs(CFG.ENGINE_CACHE_DIR, exist_ok=True)
+        engine_path = os.path.join(CFG.ENGINE_CACHE_DIR, f"engine_{sig}.pkl")
+
+        if os.path.exists(engine_path):
+            try:
+                with open(engine_path, "rb") as f:
+                    return pickle.load(f)
+            except Exception:
+                pass  # corrupt/stale cache -> rebuild below
+
+        engine = HybridSearchEngine(docs)
+        try:
+            with open(engine_path, "wb") as f:
+                pickle.dump(engine, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            pass  # cache write is best-effort
+        return engine
     except Exception as e:
         print(f"Engine Init Error: {e}")
         return None
@@ -393,10 +774,14 @@ def main():
                 
                 # UI Display of Sources (Expandable)
                 with st.expander(f"⚡ Retrieved {len(results)} items in {latency:.3f}s (Top Matches)", expanded=False):
+                    # One markdown blob = one widget update, instead of a
+                    # rerender round-trip per result
+                    lines = []
                     for doc in results:
                         color = "blue" if "daraz" in doc.source.lower() else "red"
                         score_display = f"{doc.relevance_score:.2f}"
-                        st.markdown(f":{color}[**{doc.source}**] [{doc.title}]({doc.url}) - **{doc.price_val:,.0f}৳** (Score: {score_display})")
+                        lines.append(f":{color}[**{doc.source}**] [{doc.title}]({doc.url}) - **{doc.price_val:,.0f}৳** (Score: {score_display})")
+                    st.markdown("\n\n".join(lines))
 
                 # Generative Step
                 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None